@@ -165,6 +165,7 @@ CMPVER  = $(SHLUTIL) cmpver
 CP      = cp
 CWD     = $(SHLUTIL) cwd
 FIXLINK = $(SHLUTIL) fix_symlink
+LIBDEPS = $(SHLUTIL) lib_deps
 less    = less $(1)
 MKDIR   = $(SHLUTIL) mkdir
 MKLINK  = $(SHLUTIL) mklink
@@ -0,0 +1,41 @@
+import os
+import struct
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from shlutilib import LibDeps  # noqa: E402
+
+
+class TestLibDeps(unittest.TestCase):
+
+    def parse(self, data):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'bin')
+            with open(path, 'wb') as f:
+                f.write(data)
+            return LibDeps.parse_file(path)
+
+    def test_truncated_elf_header(self):
+        # ELF64, little endian, cut before the program header fields.
+        header = b'\x7fELF\x02\x01\x01' + b'\0' * 9 + struct.pack('<HH', 2, 62)
+        self.assertIsNone(self.parse(header))
+
+    def test_truncated_pe_header(self):
+        self.assertIsNone(self.parse(b'MZ' + b'\0' * 4))
+
+    def test_truncated_file_is_skipped(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'app')
+            with open(path, 'wb') as f:
+                f.write(b'\x7fELF\x02\x01\x01' + b'\0' * 13)
+            (files, libraries, unresolved) = LibDeps().closure([path])
+            self.assertEqual(files, [path])
+            self.assertEqual(libraries, {})
+            self.assertEqual(unresolved, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,920 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""The benchmark of `shlutil.py upload`
+
+Local stand-in servers are started on loopback, synthetic artifact sets
+are uploaded to them end to end by `shlutil.py upload`, and the throughput
+and the number of round trips are reported. A delay can be injected into
+all connections to simulate high-latency links.
+
+This file is the part of the cmake-abe library (https://github.com/spritetong/cmake-abe),
+which is licensed under the MIT license (https://opensource.org/licenses/MIT).
+
+Copyright (C) 2022 spritetong@gmail.com.
+"""
+
+import os
+import sys
+import http.server
+import socket
+import socketserver
+import threading
+
+__all__ = ('UploadBench', 'DelayProxy', 'FtpStandIn', 'SftpStandIn', 'HttpStandIn',)
+
+
+class BenchStats:
+    """Counters of a stand-in server."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            # TCP connections, including FTP data connections
+            self.connections = 0
+            # Requests which wait for a reply
+            self.round_trips = 0
+            # All requests
+            self.requests = 0
+
+    def count(self, round_trip=True):
+        with self.lock:
+            self.requests += 1
+            if round_trip:
+                self.round_trips += 1
+
+    def connect(self):
+        with self.lock:
+            self.connections += 1
+
+    def to_dict(self):
+        with self.lock:
+            return {'connections': self.connections,
+                    'round_trips': self.round_trips,
+                    'requests': self.requests}
+
+
+class DelayProxy:
+    """Forward TCP connections on loopback to `target`, and delay the data
+    of both directions by `delay` seconds, like a link with a round trip
+    time of `2 * delay`.
+
+    Data is delayed as it flows, so pipelined requests are not serialized.
+    """
+
+    def __init__(self, target, delay):
+        self.target = target
+        self.delay = delay
+        self.sock = socket.create_server(('127.0.0.1', 0))
+        self.address = self.sock.getsockname()
+        threading.Thread(target=self._accept, daemon=True).start()
+
+    def close(self):
+        try:
+            # Wake up `accept()`.
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self.sock.close()
+
+    def _accept(self):
+        while True:
+            try:
+                (client, _) = self.sock.accept()
+            except OSError:
+                break
+            try:
+                upstream = socket.create_connection(self.target)
+            except OSError:
+                client.close()
+                continue
+            for sock in (client, upstream):
+                sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            self._pump(client, upstream)
+            self._pump(upstream, client)
+
+    def _pump(self, src, dst):
+        import queue
+        import time
+        chunks = queue.Queue()
+
+        def receive():
+            while True:
+                try:
+                    data = src.recv(256 * 1024)
+                except OSError:
+                    data = b''
+                chunks.put((time.monotonic() + self.delay, data))
+                if not data:
+                    break
+
+        def send():
+            while True:
+                (due, data) = chunks.get()
+                wait = due - time.monotonic()
+                if wait > 0:
+                    time.sleep(wait)
+                try:
+                    if not data:
+                        dst.shutdown(socket.SHUT_WR)
+                        break
+                    dst.sendall(data)
+                except OSError:
+                    break
+
+        threading.Thread(target=receive, daemon=True).start()
+        threading.Thread(target=send, daemon=True).start()
+
+
+class FtpStandIn:
+    """A minimal FTP server on loopback, with the commands used by
+    `FtpSession`. Remote paths are local absolute paths.
+    """
+
+    def __init__(self, username, password, delay=0):
+        self.username = username
+        self.password = password
+        # The delay of data connections, the control connection is delayed
+        # by a `DelayProxy` in front of the server.
+        self.delay = delay
+        self.stats = BenchStats()
+        self.server = socketserver.ThreadingTCPServer(
+            ('127.0.0.1', 0), FtpStandInHandler)
+        self.server.daemon_threads = True
+        self.server.stand_in = self
+        self.address = self.server.server_address
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class FtpStandInHandler(socketserver.StreamRequestHandler):
+    """The control connection of `FtpStandIn`."""
+
+    def setup(self):
+        super().setup()
+        # Replies like "150" and "226" are written back to back.
+        self.request.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.stand_in = self.server.stand_in
+        self.logged_in = False
+        self.username = ''
+        self.rest = 0
+        # (listening socket, delay proxy)
+        self.passive = None
+
+    def reply(self, line):
+        self.wfile.write((line + '\r\n').encode('utf-8'))
+        self.wfile.flush()
+
+    def handle(self):
+        self.stand_in.stats.connect()
+        self.reply('220 cmake-abe stand-in')
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                break
+            (cmd, _, arg) = line.decode('utf-8', 'replace').rstrip(
+                '\r\n').partition(' ')
+            cmd = cmd.upper()
+            self.stand_in.stats.count()
+            if cmd not in ('USER', 'PASS', 'QUIT') and not self.logged_in:
+                self.reply('530 Not logged in')
+                continue
+            method = getattr(self, 'ftp_' + cmd.lower(), None)
+            if method is None:
+                self.reply('502 Command not implemented')
+                continue
+            try:
+                if method(arg) is False:
+                    break
+            except OSError as e:
+                self.reply('550 {}'.format(e.strerror or e))
+        self._close_passive()
+
+    @staticmethod
+    def format_time(mtime):
+        import time
+        return time.strftime('%Y%m%d%H%M%S', time.gmtime(mtime))
+
+    def ftp_user(self, arg):
+        self.username = arg
+        self.reply('331 Password required')
+
+    def ftp_pass(self, arg):
+        stand_in = self.stand_in
+        self.logged_in = (self.username == stand_in.username and
+                          arg == stand_in.password)
+        self.reply('230 Logged in' if self.logged_in else '530 Login incorrect')
+
+    def ftp_quit(self, _arg):
+        self.reply('221 Bye')
+        return False
+
+    def ftp_noop(self, _arg):
+        self.reply('200 OK')
+
+    def ftp_type(self, _arg):
+        self.reply('200 Type set')
+
+    def ftp_opts(self, _arg):
+        self.reply('200 OK')
+
+    def ftp_feat(self, _arg):
+        self.reply('211-Features:\r\n MDTM\r\n MFMT\r\n MLST type*;size*;modify*;\r\n'
+                   ' REST STREAM\r\n SIZE\r\n211 End')
+
+    def ftp_pwd(self, _arg):
+        self.reply('257 "/"')
+
+    def ftp_cwd(self, arg):
+        if os.path.isdir(arg):
+            self.reply('250 OK')
+        else:
+            self.reply('550 No such directory')
+
+    def ftp_mkd(self, arg):
+        os.mkdir(arg)
+        self.reply('257 "{}" created'.format(arg))
+
+    def ftp_rest(self, arg):
+        self.rest = int(arg)
+        self.reply('350 Restarting at {}'.format(self.rest))
+
+    def ftp_size(self, arg):
+        if os.path.isfile(arg):
+            self.reply('213 {}'.format(os.path.getsize(arg)))
+        else:
+            self.reply('550 No such file')
+
+    def ftp_mdtm(self, arg):
+        if os.path.isfile(arg):
+            self.reply('213 ' + self.format_time(os.path.getmtime(arg)))
+        else:
+            self.reply('550 No such file')
+
+    def ftp_mfmt(self, arg):
+        import calendar
+        import time
+        (stamp, _, path) = arg.partition(' ')
+        mtime = calendar.timegm(time.strptime(stamp[:14], '%Y%m%d%H%M%S'))
+        os.utime(path, (mtime, mtime))
+        self.reply('213 Modify={}; {}'.format(stamp, path))
+
+    def ftp_pasv(self, _arg):
+        port = self._open_passive()
+        self.reply('227 Entering Passive Mode (127,0,0,1,{},{})'.format(
+            port >> 8, port & 0xFF))
+
+    def ftp_epsv(self, _arg):
+        self.reply('229 Entering Extended Passive Mode (|||{}|)'.format(
+            self._open_passive()))
+
+    def ftp_stor(self, arg):
+        (rest, self.rest) = (self.rest, 0)
+        with open(arg, 'r+b' if rest else 'wb') as f:
+            f.seek(rest)
+            f.truncate()
+            with self._accept_data() as conn:
+                while True:
+                    data = conn.recv(256 * 1024)
+                    if not data:
+                        break
+                    f.write(data)
+        self.reply('226 Transfer complete')
+
+    def ftp_mlsd(self, arg):
+        import stat
+        lines = []
+        with os.scandir(arg or '.') as entries:
+            for entry in entries:
+                st = entry.stat(follow_symlinks=False)
+                lines.append('type={};size={};modify={}; {}\r\n'.format(
+                    'dir' if stat.S_ISDIR(st.st_mode) else
+                    'file' if stat.S_ISREG(st.st_mode) else 'OS.unix=symlink',
+                    st.st_size, self.format_time(st.st_mtime), entry.name))
+        with self._accept_data() as conn:
+            conn.sendall(''.join(lines).encode('utf-8'))
+        self.reply('226 Transfer complete')
+
+    def _open_passive(self):
+        self._close_passive()
+        sock = socket.create_server(('127.0.0.1', 0))
+        sock.settimeout(10)
+        proxy = None
+        if self.stand_in.delay > 0:
+            proxy = DelayProxy(sock.getsockname(), self.stand_in.delay)
+        self.passive = (sock, proxy)
+        return (proxy.address if proxy is not None else sock.getsockname())[1]
+
+    def _accept_data(self):
+        if self.passive is None:
+            raise OSError('Use PASV or EPSV first')
+        self.reply('150 Opening data connection')
+        try:
+            (conn, _) = self.passive[0].accept()
+        finally:
+            self._close_passive()
+        self.stand_in.stats.connect()
+        return conn
+
+    def _close_passive(self):
+        if self.passive is not None:
+            (sock, proxy) = self.passive
+            sock.close()
+            if proxy is not None:
+                proxy.close()
+            self.passive = None
+
+
+class SftpStandIn:
+    """A SFTP server on loopback, which can execute shell commands too.
+    Remote paths are local absolute paths.
+
+    `paramiko` is required.
+    """
+
+    CLASSES = None
+
+    def __init__(self, username, password):
+        import paramiko
+        (self.ServerInterface, self.SFTPServer, self.SFTPInterface) = \
+            self.server_classes(paramiko)
+        self.paramiko = paramiko
+        self.username = username
+        self.password = password
+        self.stats = BenchStats()
+        self.host_key = paramiko.RSAKey.generate(2048)
+        self.sock = socket.create_server(('127.0.0.1', 0))
+        self.address = self.sock.getsockname()
+        threading.Thread(target=self._accept, daemon=True).start()
+
+    def close(self):
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self.sock.close()
+
+    def _accept(self):
+        while True:
+            try:
+                (conn, _) = self.sock.accept()
+            except OSError:
+                break
+            self.stats.connect()
+            transport = self.paramiko.Transport(conn)
+            transport.add_server_key(self.host_key)
+            transport.set_subsystem_handler(
+                'sftp', self.SFTPServer, self.SFTPInterface)
+            transport.start_server(server=self.ServerInterface(self))
+
+    @classmethod
+    def server_classes(Self, paramiko):
+        """Define the paramiko based classes once paramiko is imported."""
+        import subprocess
+        if Self.CLASSES is not None:
+            return Self.CLASSES
+
+        class ServerInterface(paramiko.ServerInterface):
+            def __init__(self, stand_in):
+                self.stand_in = stand_in
+
+            def get_allowed_auths(self, username):
+                return 'password'
+
+            def check_auth_password(self, username, password):
+                self.stand_in.stats.count()
+                if (username == self.stand_in.username and
+                        password == self.stand_in.password):
+                    return paramiko.AUTH_SUCCESSFUL
+                return paramiko.AUTH_FAILED
+
+            def check_channel_request(self, kind, chanid):
+                self.stand_in.stats.count()
+                return paramiko.OPEN_SUCCEEDED
+
+            def check_channel_exec_request(self, channel, command):
+                self.stand_in.stats.count()
+                threading.Thread(target=self._exec, args=(channel, command),
+                                 daemon=True).start()
+                return True
+
+            @staticmethod
+            def _exec(channel, command):
+                # The root of SFTP is the root directory.
+                process = subprocess.Popen(command, shell=True, cwd='/', stdin=subprocess.PIPE,
+                                           stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+
+                def feed():
+                    try:
+                        while True:
+                            data = channel.recv(256 * 1024)
+                            if not data:
+                                break
+                            process.stdin.write(data)
+                    except OSError:
+                        pass
+                    finally:
+                        process.stdin.close()
+                threading.Thread(target=feed, daemon=True).start()
+                output = process.stdout.read()
+                status = process.wait()
+                channel.sendall(output)
+                channel.send_exit_status(status)
+                channel.close()
+
+        class SFTPServer(paramiko.SFTPServer):
+            def _process(self, t, request_number, msg):
+                # Pipelined writes do not wait for their replies.
+                self.get_server().stand_in.stats.count(
+                    round_trip=t != paramiko.sftp.CMD_WRITE)
+                return super()._process(t, request_number, msg)
+
+        class SFTPHandle(paramiko.SFTPHandle):
+            def stat(self):
+                return paramiko.SFTPAttributes.from_stat(os.fstat(self.readfile.fileno()))
+
+            def chattr(self, attr):
+                return paramiko.SFTP_OK
+
+        def errno_of(e):
+            return paramiko.SFTPServer.convert_errno(e.errno)
+
+        class SFTPInterface(paramiko.SFTPServerInterface):
+            def open(self, path, flags, attr):
+                try:
+                    fd = os.open(path, flags, 0o644)
+                except OSError as e:
+                    return errno_of(e)
+                if flags & os.O_APPEND:
+                    mode = 'ab'
+                elif flags & os.O_RDWR:
+                    mode = 'r+b'
+                elif flags & os.O_WRONLY:
+                    mode = 'wb'
+                else:
+                    mode = 'rb'
+                handle = SFTPHandle(flags)
+                handle.readfile = handle.writefile = os.fdopen(fd, mode)
+                return handle
+
+            def stat(self, path):
+                try:
+                    return paramiko.SFTPAttributes.from_stat(os.stat(path))
+                except OSError as e:
+                    return errno_of(e)
+
+            def lstat(self, path):
+                try:
+                    return paramiko.SFTPAttributes.from_stat(os.lstat(path))
+                except OSError as e:
+                    return errno_of(e)
+
+            def list_folder(self, path):
+                try:
+                    return [paramiko.SFTPAttributes.from_stat(
+                        os.lstat(os.path.join(path, name)), name)
+                        for name in os.listdir(path)]
+                except OSError as e:
+                    return errno_of(e)
+
+            def mkdir(self, path, attr):
+                try:
+                    os.mkdir(path)
+                except OSError as e:
+                    return errno_of(e)
+                return paramiko.SFTP_OK
+
+            def chattr(self, path, attr):
+                try:
+                    if attr.st_mtime is not None:
+                        os.utime(path, (attr.st_atime, attr.st_mtime))
+                    if attr.st_mode is not None:
+                        os.chmod(path, attr.st_mode & 0o7777)
+                except OSError as e:
+                    return errno_of(e)
+                return paramiko.SFTP_OK
+
+            def rename(self, oldpath, newpath):
+                return self.posix_rename(oldpath, newpath)
+
+            def posix_rename(self, oldpath, newpath):
+                try:
+                    os.replace(oldpath, newpath)
+                except OSError as e:
+                    return errno_of(e)
+                return paramiko.SFTP_OK
+
+            def remove(self, path):
+                try:
+                    os.unlink(path)
+                except OSError as e:
+                    return errno_of(e)
+                return paramiko.SFTP_OK
+
+            def symlink(self, target_path, path):
+                try:
+                    os.symlink(target_path, path)
+                except OSError as e:
+                    return errno_of(e)
+                return paramiko.SFTP_OK
+
+            def readlink(self, path):
+                try:
+                    return os.readlink(path)
+                except OSError as e:
+                    return errno_of(e)
+
+        Self.CLASSES = (ServerInterface, SFTPServer, SFTPInterface)
+        return Self.CLASSES
+
+
+class HttpStandIn:
+    """A HTTP server on loopback which accepts PUT, with the WebDAV methods
+    used by `HttpSession`. Remote paths are local absolute paths.
+    """
+
+    def __init__(self, username, password):
+        import base64
+        import http.server
+        self.username = username
+        self.password = password
+        self.authorization = 'Basic ' + base64.b64encode(
+            '{}:{}'.format(username, password).encode('utf-8')).decode()
+        self.stats = BenchStats()
+        self.server = http.server.ThreadingHTTPServer(
+            ('127.0.0.1', 0), HttpStandInHandler)
+        self.server.daemon_threads = True
+        self.server.stand_in = self
+        self.address = self.server.server_address
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class HttpStandInHandler(http.server.BaseHTTPRequestHandler):
+    """A keep-alive connection of `HttpStandIn`."""
+
+    protocol_version = 'HTTP/1.1'
+
+    def setup(self):
+        super().setup()
+        self.request.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.stand_in = self.server.stand_in
+        self.stand_in.stats.connect()
+
+    def log_message(self, format, *args):
+        pass
+
+    def reply(self, status, body=b'', headers=None):
+        self.send_response(status)
+        for (name, value) in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if self.command != 'HEAD':
+            self.wfile.write(body)
+
+    def path_of(self):
+        import urllib.parse
+        return urllib.parse.unquote(urllib.parse.urlparse(self.path).path)
+
+    def read_body(self, write=None):
+        # Read `Content-Length` or chunked bodies.
+        def read(n):
+            while n > 0:
+                data = self.rfile.read(min(n, 256 * 1024))
+                if not data:
+                    raise EOFError
+                if write is not None:
+                    write(data)
+                n -= len(data)
+        if self.headers.get('Transfer-Encoding', '').lower() == 'chunked':
+            while True:
+                n = int(self.rfile.readline().split(b';')[0], 16)
+                read(n)
+                self.rfile.readline()
+                if n == 0:
+                    break
+        else:
+            read(int(self.headers.get('Content-Length', 0)))
+
+    def handle_one_request(self):
+        # Count each request, and check the authorization before the method.
+        self.raw_requestline = self.rfile.readline(65537)
+        if not self.raw_requestline:
+            self.close_connection = True
+            return
+        if not self.parse_request():
+            return
+        self.stand_in.stats.count()
+        if self.headers.get('Authorization') != self.stand_in.authorization:
+            self.read_body()
+            self.reply(401, headers={'WWW-Authenticate': 'Basic realm="stand-in"'})
+        else:
+            method = getattr(self, 'do_' + self.command, None)
+            if method is None:
+                self.read_body()
+                self.reply(501)
+            else:
+                try:
+                    method()
+                except OSError as e:
+                    self.reply(500, (e.strerror or str(e)).encode('utf-8'))
+        self.wfile.flush()
+
+    def do_HEAD(self):
+        path = self.path_of()
+        if os.path.isfile(path):
+            self.send_response(200)
+            self.send_header('Content-Length', str(os.path.getsize(path)))
+            self.end_headers()
+        else:
+            self.reply(404)
+
+    def do_PUT(self):
+        path = self.path_of()
+        if not os.path.isdir(os.path.dirname(path)):
+            self.read_body()
+            self.reply(409)
+            return
+        tmp_path = '{}.{}.put'.format(path, threading.get_ident())
+        with open(tmp_path, 'wb') as f:
+            self.read_body(f.write)
+        os.replace(tmp_path, path)
+        self.reply(201)
+
+    def do_MKCOL(self):
+        path = self.path_of().rstrip('/')
+        self.read_body()
+        if os.path.exists(path):
+            self.reply(405)
+        elif not os.path.isdir(os.path.dirname(path)):
+            self.reply(409)
+        else:
+            os.mkdir(path)
+            self.reply(201)
+
+    def do_PROPFIND(self):
+        import urllib.parse
+        from xml.sax.saxutils import escape
+        self.read_body()
+        path = self.path_of().rstrip('/')
+        if not os.path.isdir(path):
+            self.reply(404)
+            return
+        responses = []
+        with os.scandir(path) as entries:
+            for entry in entries:
+                href = urllib.parse.quote('{}/{}'.format(path, entry.name))
+                if entry.is_dir(follow_symlinks=False):
+                    prop = '<D:resourcetype><D:collection/></D:resourcetype>'
+                elif entry.is_file(follow_symlinks=False):
+                    prop = '<D:resourcetype/><D:getcontentlength>{}</D:getcontentlength>'.format(
+                        entry.stat(follow_symlinks=False).st_size)
+                else:
+                    continue
+                responses.append('<D:response><D:href>{}</D:href><D:propstat><D:prop>{}'
+                                 '</D:prop><D:status>HTTP/1.1 200 OK</D:status>'
+                                 '</D:propstat></D:response>'.format(escape(href), prop))
+        body = ('<?xml version="1.0" encoding="utf-8"?><D:multistatus xmlns:D="DAV:">'
+                '{}</D:multistatus>'.format(''.join(responses)))
+        self.reply(207, body.encode('utf-8'),
+                   {'Content-Type': 'application/xml; charset="utf-8"'})
+
+
+class UploadBench:
+    """Run `shlutil.py upload` against local stand-in servers.
+
+    Each scenario is a protocol, an artifact set and a delay. It's uploaded
+    twice: `cold` to an empty directory, then `warm` with nothing changed.
+    """
+
+    PROTOCOLS = ('ftp', 'sftp', 'http',)
+    SETS = ('huge', 'tiny', 'symlinks',)
+    USERNAME = 'bench'
+
+    def __init__(self, work_dir, scale=1.0, upload_args=None):
+        import secrets
+        self.work_dir = work_dir
+        self.scale = scale
+        self.upload_args = upload_args or []
+        self.password = secrets.token_hex(8)
+        # {protocol: stand-in server}
+        self.servers = {}
+
+    def close(self):
+        for server in self.servers.values():
+            server.close()
+        self.servers = {}
+
+    def server(self, protocol, delay):
+        key = (protocol, delay)
+        if key not in self.servers:
+            if protocol == 'ftp':
+                self.servers[key] = FtpStandIn(self.USERNAME, self.password, delay)
+            elif protocol == 'sftp':
+                self.servers[key] = SftpStandIn(self.USERNAME, self.password)
+            elif protocol == 'http':
+                self.servers[key] = HttpStandIn(self.USERNAME, self.password)
+            else:
+                raise ValueError('Unsupported protocol: {}'.format(protocol))
+        return self.servers[key]
+
+    def make_set(self, name):
+        """Generate an artifact set once, returns its directory."""
+        import random
+        set_dir = os.path.join(self.work_dir, 'local', name)
+        if os.path.isdir(set_dir):
+            return set_dir
+        os.makedirs(set_dir)
+        rand = random.Random(0)
+        if name == 'huge':
+            # A few huge binaries
+            block = os.urandom(1024 * 1024)
+            for i in range(3):
+                with open(os.path.join(set_dir, 'huge{}.bin'.format(i)), 'wb') as f:
+                    for _ in range(max(1, int(32 * self.scale))):
+                        f.write(block)
+        elif name == 'tiny':
+            # Thousands of tiny files
+            for i in range(max(1, int(2000 * self.scale))):
+                with open(os.path.join(set_dir, 'tiny{:05}.h'.format(i)), 'wb') as f:
+                    f.write(os.urandom(rand.randint(64, 4096)))
+        elif name == 'symlinks':
+            # Shared libraries with version symbolic links
+            for i in range(max(1, int(50 * self.scale))):
+                real = 'libbench{}.so.1.2.{}'.format(i, i)
+                with open(os.path.join(set_dir, real), 'wb') as f:
+                    f.write(os.urandom(rand.randint(16, 256) * 1024))
+                os.symlink(real, os.path.join(set_dir, 'libbench{}.so.1'.format(i)))
+                os.symlink('libbench{}.so.1'.format(i),
+                           os.path.join(set_dir, 'libbench{}.so'.format(i)))
+        else:
+            raise ValueError('Unknown artifact set: {}'.format(name))
+        return set_dir
+
+    def run_scenario(self, protocol, set_name, delay):
+        import shutil
+        set_dir = self.make_set(set_name)
+        server = self.server(protocol, delay)
+        proxy = DelayProxy(server.address, delay) if delay > 0 else None
+        (host, port) = proxy.address if proxy is not None else server.address
+
+        scenario = '{}-{}-{}ms'.format(protocol, set_name, int(delay * 1000))
+        remote_dir = os.path.join(self.work_dir, 'remote', scenario)
+        cache_dir = os.path.join(self.work_dir, 'cache', scenario)
+        for dir in (remote_dir, cache_dir):
+            shutil.rmtree(dir, ignore_errors=True)
+        os.makedirs(remote_dir)
+        url = '{}://{}:{}@{}:{}{}/'.format(protocol, self.USERNAME, self.password,
+                                          host, port, remote_dir.replace('\\', '/'))
+        results = []
+        try:
+            for phase in ('cold', 'warm'):
+                server.stats.reset()
+                # The directory tree is mirrored, including symbolic links.
+                result = self.upload(url, set_dir, cache_dir)
+                result.update(server.stats.to_dict())
+                result.update({'protocol': protocol, 'set': set_name,
+                               'delay_ms': int(delay * 1000), 'phase': phase})
+                results.append(result)
+        finally:
+            if proxy is not None:
+                proxy.close()
+        return results
+
+    def upload(self, url, pattern, cache_dir):
+        import contextlib
+        import io
+        import json
+        import time
+        from shlutilib import ShellCmd
+        stdout = io.StringIO()
+        stderr = io.StringIO()
+        saved_cache_dir = os.environ.get('CMKABE_CACHE_DIR')
+        os.environ['CMKABE_CACHE_DIR'] = cache_dir
+        start = time.time()
+        try:
+            with contextlib.redirect_stdout(stdout), contextlib.redirect_stderr(stderr):
+                status = ShellCmd.main(['upload', url, pattern, '-r', '--json',
+                                        '--no-agent'] + self.upload_args)
+        finally:
+            if saved_cache_dir is None:
+                del os.environ['CMKABE_CACHE_DIR']
+            else:
+                os.environ['CMKABE_CACHE_DIR'] = saved_cache_dir
+        seconds = time.time() - start
+        try:
+            summary = json.loads(stdout.getvalue())
+        except ValueError:
+            summary = {}
+        if status != 0:
+            sys.stderr.write(stderr.getvalue())
+        files = summary.get('files', [])
+        sent = sum(x.get('bytes_sent', 0) for x in files)
+        return {
+            'status': status,
+            'files': len(files),
+            'bytes': sum(x.get('size', 0) for x in files),
+            'bytes_sent': sent,
+            'seconds': round(seconds, 3),
+            'bytes_per_sec': round(sent / seconds, 1) if seconds > 0 else None,
+            'failed': summary.get('failed'),
+        }
+
+    @staticmethod
+    def print_table(results):
+        columns = ('protocol', 'set', 'delay_ms', 'phase', 'files', 'bytes_sent',
+                   'seconds', 'MiB/s', 'connections', 'round_trips', 'status')
+        rows = [columns]
+        for result in results:
+            rate = result['bytes_per_sec']
+            rows.append(tuple(str(result.get(x, '')) for x in columns[:7]) +
+                        ('{:.1f}'.format(rate / (1024 * 1024)) if rate else '-',) +
+                        tuple(str(result[x]) for x in columns[8:]))
+        widths = [max(len(row[i]) for row in rows) for i in range(len(columns))]
+        for row in rows:
+            print('  '.join(x.rjust(w) for (x, w) in zip(row, widths)))
+
+    @staticmethod
+    def main(args=None):
+        import json
+        import shlex
+        import shutil
+        import tempfile
+        from argparse import ArgumentParser, RawTextHelpFormatter
+
+        def list_of(choices):
+            def parse(s):
+                items = [x.strip() for x in s.split(',') if x.strip()]
+                for item in items:
+                    if item not in choices:
+                        raise ValueError(item)
+                return items
+            return parse
+
+        parser = ArgumentParser(formatter_class=RawTextHelpFormatter,
+                                description='Benchmark `shlutil.py upload` with local stand-in servers.',
+                                epilog='examples:\n'
+                                '  # All protocols and artifact sets, without and with a 20ms delay\n'
+                                '  upbench.py --delays 0,20\n\n'
+                                '  # Compare the number of connections on a high-latency link\n'
+                                '  upbench.py --sets tiny --delays 50 --upload-args "--connections 4"\n')
+        parser.add_argument('--protocols', metavar='LIST',
+                            type=list_of(UploadBench.PROTOCOLS), default=list(UploadBench.PROTOCOLS),
+                            help='protocols separated by commas, defaults to "{}"'.format(
+                                ','.join(UploadBench.PROTOCOLS)))
+        parser.add_argument('--sets', metavar='LIST',
+                            type=list_of(UploadBench.SETS), default=list(UploadBench.SETS),
+                            help='artifact sets separated by commas, defaults to "{}"'.format(
+                                ','.join(UploadBench.SETS)))
+        parser.add_argument('--delays', metavar='LIST',
+                            type=lambda s: [float(x) for x in s.split(',')], default=[0],
+                            help='one-way delays in milliseconds separated by commas, defaults to 0')
+        parser.add_argument('--scale', metavar='FACTOR',
+                            type=float, default=1.0,
+                            help='scale the size of artifact sets, defaults to 1.0')
+        parser.add_argument('--upload-args', metavar='ARGS',
+                            type=shlex.split, default=[],
+                            help='extra options of `shlutil.py upload`')
+        parser.add_argument('--work-dir', metavar='DIR',
+                            help='keep artifact sets in DIR, defaults to a temporary directory')
+        parser.add_argument('--json',
+                            action='store_true', default=False,
+                            help='print results as JSON')
+        options = parser.parse_args(args)
+
+        work_dir = options.work_dir or tempfile.mkdtemp(prefix='upbench-')
+        bench = UploadBench(os.path.realpath(work_dir), options.scale,
+                            options.upload_args)
+        results = []
+        try:
+            for delay in options.delays:
+                for protocol in options.protocols:
+                    for set_name in options.sets:
+                        results.extend(bench.run_scenario(
+                            protocol, set_name, delay / 1000.0))
+        except ImportError as e:
+            print(e, file=sys.stderr)
+            return 1
+        except KeyboardInterrupt:
+            print('^C', file=sys.stderr)
+            return 2
+        finally:
+            bench.close()
+            if not options.work_dir:
+                shutil.rmtree(work_dir, ignore_errors=True)
+
+        if options.json:
+            print(json.dumps(results, indent=2))
+        else:
+            UploadBench.print_table(results)
+        return 1 if any(x['status'] != 0 for x in results) else 0